@@ -4,19 +4,40 @@ Messages endpoint for querying stored messages.
 from datetime import datetime
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, Query
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, literal_column, select, tuple_
 
 from app.core.database import get_db
 from app.core.logging import get_logger
-from app.models.message import Message
-from app.schemas.message import MessagesListResponse, MessageResponse
+from app.models.message import Message, messages_fts
+from app.schemas.message import MessagesListResponse
 
 logger = get_logger(__name__)
 
 router = APIRouter(tags=["Messages"])
 
+# Columns returned by /messages, labelled with MessageResponse's field aliases
+MESSAGE_COLUMNS = (
+    Message.message_id,
+    Message.sender.label("from"),
+    Message.recipient.label("to"),
+    Message.ts,
+    Message.text,
+    Message.created_at,
+)
+MESSAGE_FIELDS = tuple(col.key for col in MESSAGE_COLUMNS)
+
+
+def build_fts_query(q: str) -> str:
+    """
+    Turn free text into an FTS5 query matching every word by prefix.
+    
+    Each word is quoted so FTS5 operators in user input are taken literally.
+    """
+    return " ".join('"{}"*'.format(word.replace('"', '""')) for word in q.split())
+
 
 @router.get(
     "/messages",
@@ -30,8 +51,10 @@ async def list_messages(
     offset: Annotated[int, Query(ge=0, description="Number of messages to skip")] = 0,
     from_: Annotated[Optional[str], Query(alias="from", description="Filter by sender")] = None,
     since: Annotated[Optional[datetime], Query(description="Filter messages since timestamp (ISO-8601)")] = None,
-    q: Annotated[Optional[str], Query(description="Case-insensitive text search")] = None,
-) -> MessagesListResponse:
+    q: Annotated[Optional[str], Query(description="Case-insensitive full-text search (word prefixes)")] = None,
+    after_ts: Annotated[Optional[datetime], Query(description="Cursor: ts of the last message already seen")] = None,
+    after_id: Annotated[Optional[str], Query(description="Cursor: message_id of the last message already seen")] = None,
+) -> Response:
     """
     List messages with pagination and optional filters.
     
@@ -39,51 +62,66 @@ async def list_messages(
     - **offset**: Number of messages to skip (default 0)
     - **from**: Filter by exact sender phone number
     - **since**: Filter messages with ts >= given timestamp
-    - **q**: Case-insensitive substring search in message text
+    - **q**: Case-insensitive search for messages containing words starting with each term
+    - **after_ts** / **after_id**: Keyset cursor from `next_cursor`; returns the
+      page after that message and ignores **offset**
     """
-    # Build base query
-    query = db.query(Message)
-    count_query = db.query(func.count(Message.message_id))
+    if (after_ts is None) != (after_id is None):
+        raise HTTPException(status_code=422, detail="after_ts and after_id must be provided together")
+    
+    # Build filter conditions
+    conditions = []
     
-    # Apply filters
     if from_:
-        query = query.filter(Message.sender == from_)
-        count_query = count_query.filter(Message.sender == from_)
+        conditions.append(Message.sender == from_)
     
     if since:
-        query = query.filter(Message.ts >= since)
-        count_query = count_query.filter(Message.ts >= since)
+        conditions.append(Message.ts >= since)
     
     if q:
-        # Case-insensitive search using LIKE
-        search_pattern = f"%{q}%"
-        query = query.filter(Message.text.ilike(search_pattern))
-        count_query = count_query.filter(Message.text.ilike(search_pattern))
+        # Full-text search through the FTS5 index instead of a LIKE scan;
+        # a q without any words (e.g. only spaces) applies no filter
+        fts_query = build_fts_query(q)
+        if fts_query:
+            conditions.append(
+                literal_column("messages.rowid").in_(
+                    select(messages_fts.c.rowid).where(messages_fts.c.messages_fts.match(fts_query))
+                )
+            )
+    
+    # Ordering: ORDER BY ts ASC, message_id ASC, served by ix_messages_list_cover
+    # so SQLite stops after `limit` rows instead of sorting every match
+    stmt = (
+        select(*MESSAGE_COLUMNS)
+        .where(*conditions)
+        .order_by(Message.ts.asc(), Message.message_id.asc())
+        .limit(limit)
+    )
     
-    # Get total count before pagination
-    total = count_query.scalar()
+    if after_ts is not None:
+        # Keyset pagination: seek past the cursor on the index instead of
+        # scanning and discarding `offset` rows
+        stmt = stmt.where(tuple_(Message.ts, Message.message_id) > tuple_(after_ts, after_id))
+    else:
+        stmt = stmt.offset(offset)
     
-    # Apply ordering: ORDER BY ts ASC, message_id ASC
-    query = query.order_by(Message.ts.asc(), Message.message_id.asc())
+    rows = db.execute(stmt).mappings().all()
     
-    # Apply pagination
-    query = query.offset(offset).limit(limit)
+    # Total of all filtered rows, independent of the page or cursor
+    total = db.execute(
+        select(func.count()).select_from(Message).where(*conditions)
+    ).scalar()
     
-    # Execute query
-    messages = query.all()
+    # Row mappings already carry the wire field names, and the stored values
+    # passed validation on ingest, so they are serialized straight to JSON
+    # instead of round-tripping through MessageResponse/MessagesListResponse
+    data = [{name: row[name] for name in MESSAGE_FIELDS} for row in rows]
     
-    # Convert to response models
-    data = [
-        MessageResponse(
-            message_id=msg.message_id,
-            from_=msg.sender,
-            to=msg.recipient,
-            ts=msg.ts,
-            text=msg.text,
-            created_at=msg.created_at,
-        )
-        for msg in messages
-    ]
+    # A full page may have more rows after it
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = (last["ts"].isoformat(), last["message_id"])
     
     logger.debug(
         f"Listed messages",
@@ -97,9 +135,13 @@ async def list_messages(
         }
     )
     
-    return MessagesListResponse(
-        data=data,
-        total=total,
-        limit=limit,
-        offset=offset,
+    return Response(
+        content=orjson.dumps({
+            "data": data,
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "next_cursor": next_cursor,
+        }),
+        media_type="application/json",
     )
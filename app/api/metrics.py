@@ -2,10 +2,10 @@
 Prometheus-style metrics endpoint.
 """
 import time
-from typing import Callable
 
-from fastapi import APIRouter, Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.logging import get_logger
 
@@ -13,108 +13,107 @@ logger = get_logger(__name__)
 
 router = APIRouter(tags=["Metrics"])
 
-# Simple in-memory metrics storage
-_metrics = {
-    "http_requests_total": {},  # {method_path_status: count}
-    "http_request_duration_seconds": {},  # {method_path: [durations]}
-    "startup_time": None,
-}
+# Application info
+APP_INFO = Gauge("app_info", "Application information", ["version"])
+APP_INFO.labels("1.0.0").set(1)
+
+START_TIME = Gauge("app_start_time_seconds", "Unix timestamp when the app started")
+
+# HTTP request metrics
+REQUESTS = Counter(
+    "http_requests_total",
+    "Total number of HTTP requests",
+    ["method", "path", "status"],
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request duration in seconds",
+    ["method", "path"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+
+# Path label used for requests that did not match any route
+UNMATCHED_PATH = "__unmatched__"
+
+# Labelled children keyed by label tuples, so the hot path skips labels()
+_request_counters = {}  # {(method, path, status_code): counter}
+_latency_histograms = {}  # {(method, path): histogram}
 
 
 def record_request(method: str, path: str, status_code: int, duration: float) -> None:
     """Record an HTTP request metric."""
-    # Total requests counter
-    key = f'{method}_{path}_{status_code}'
-    _metrics["http_requests_total"][key] = _metrics["http_requests_total"].get(key, 0) + 1
-    
-    # Duration histogram (simplified - just track values)
-    duration_key = f'{method}_{path}'
-    if duration_key not in _metrics["http_request_duration_seconds"]:
-        _metrics["http_request_duration_seconds"][duration_key] = []
-    
-    durations = _metrics["http_request_duration_seconds"][duration_key]
-    durations.append(duration)
-    
-    # Keep only last 1000 durations to prevent memory issues
-    if len(durations) > 1000:
-        _metrics["http_request_duration_seconds"][duration_key] = durations[-1000:]
+    key = (method, path, status_code)
+    counter = _request_counters.get(key)
+    if counter is None:
+        counter = _request_counters[key] = REQUESTS.labels(method, path, str(status_code))
+    counter.inc()
+
+    duration_key = (method, path)
+    histogram = _latency_histograms.get(duration_key)
+    if histogram is None:
+        histogram = _latency_histograms[duration_key] = LATENCY.labels(method, path)
+    histogram.observe(duration)
 
 
 def set_startup_time() -> None:
     """Record application startup time."""
-    _metrics["startup_time"] = time.time()
+    START_TIME.set(time.time())
 
 
-class MetricsMiddleware(BaseHTTPMiddleware):
-    """Middleware to collect request metrics."""
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware to collect request metrics.
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Skip metrics endpoint to avoid recursion
-        if request.url.path == "/metrics":
-            return await call_next(request)
-        
-        start_time = time.time()
-        response = await call_next(request)
-        duration = time.time() - start_time
+    Wraps `send` to read the response status instead of going through
+    BaseHTTPMiddleware, which spawns a task group per request.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Skip non-HTTP traffic and the metrics endpoint to avoid recursion
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
         
-        # Normalize path to avoid high cardinality
-        path = request.url.path
+        status_code = 500
         
-        record_request(
-            method=request.method,
-            path=path,
-            status_code=response.status_code,
-            duration=duration,
-        )
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
         
-        return response
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start_time
+            
+            # Normalize path to the matched route template to avoid high cardinality
+            route = scope.get("route")
+            if route is not None:
+                path = route.path
+            elif status_code == 404:
+                # Unrouted 404s (scanners, typos) would each add a new series
+                path = None
+            else:
+                path = UNMATCHED_PATH
+            
+            if path is not None:
+                record_request(
+                    method=scope["method"],
+                    path=path,
+                    status_code=status_code,
+                    duration=duration,
+                )
 
 
-def generate_prometheus_metrics() -> str:
+def generate_prometheus_metrics() -> bytes:
     """Generate Prometheus-format metrics output."""
-    lines = []
-    
-    # Application info
-    lines.append("# HELP app_info Application information")
-    lines.append("# TYPE app_info gauge")
-    lines.append('app_info{version="1.0.0"} 1')
-    lines.append("")
-    
-    # Startup time
-    if _metrics["startup_time"]:
-        lines.append("# HELP app_start_time_seconds Unix timestamp when the app started")
-        lines.append("# TYPE app_start_time_seconds gauge")
-        lines.append(f'app_start_time_seconds {_metrics["startup_time"]:.3f}')
-        lines.append("")
-    
-    # HTTP requests total
-    lines.append("# HELP http_requests_total Total number of HTTP requests")
-    lines.append("# TYPE http_requests_total counter")
-    for key, count in _metrics["http_requests_total"].items():
-        parts = key.rsplit("_", 1)
-        method_path = parts[0]
-        status = parts[1]
-        method_path_parts = method_path.split("_", 1)
-        method = method_path_parts[0]
-        path = method_path_parts[1] if len(method_path_parts) > 1 else "/"
-        lines.append(f'http_requests_total{{method="{method}",path="{path}",status="{status}"}} {count}')
-    lines.append("")
-    
-    # HTTP request duration (simplified histogram summary)
-    lines.append("# HELP http_request_duration_seconds HTTP request duration in seconds")
-    lines.append("# TYPE http_request_duration_seconds summary")
-    for key, durations in _metrics["http_request_duration_seconds"].items():
-        if durations:
-            parts = key.split("_", 1)
-            method = parts[0]
-            path = parts[1] if len(parts) > 1 else "/"
-            avg = sum(durations) / len(durations)
-            count = len(durations)
-            total = sum(durations)
-            lines.append(f'http_request_duration_seconds_sum{{method="{method}",path="{path}"}} {total:.6f}')
-            lines.append(f'http_request_duration_seconds_count{{method="{method}",path="{path}"}} {count}')
-    
-    return "\n".join(lines)
+    return generate_latest()
 
 
 @router.get(
@@ -132,5 +131,5 @@ async def metrics() -> Response:
     content = generate_prometheus_metrics()
     return Response(
         content=content,
-        media_type="text/plain; version=0.0.4; charset=utf-8",
+        media_type=CONTENT_TYPE_LATEST,
     )
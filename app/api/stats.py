@@ -5,7 +5,7 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 
 from app.core.database import get_db
 from app.core.logging import get_logger
@@ -34,11 +34,16 @@ async def get_stats(
     - Top 10 senders by message count
     - First and last message timestamps
     """
-    # Total messages
-    total_messages = db.query(func.count(Message.message_id)).scalar() or 0
-    
-    # Unique senders count
-    senders_count = db.query(func.count(func.distinct(Message.sender))).scalar() or 0
+    # Scalar aggregates in one statement and one table scan:
+    # total messages, unique senders, first and last message timestamps
+    total_messages, senders_count, first_message_ts, last_message_ts = db.execute(
+        select(
+            func.count(Message.message_id),
+            func.count(func.distinct(Message.sender)),
+            func.min(Message.ts),
+            func.max(Message.ts),
+        )
+    ).one()
     
     # Top 10 senders by message count
     top_senders_query = (
@@ -57,10 +62,6 @@ async def get_stats(
         for sender, count in top_senders_query
     ]
     
-    # First and last message timestamps
-    first_message_ts = db.query(func.min(Message.ts)).scalar()
-    last_message_ts = db.query(func.max(Message.ts)).scalar()
-    
     logger.debug(
         "Generated stats",
         extra={
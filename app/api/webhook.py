@@ -1,12 +1,12 @@
 """
 Webhook endpoint for ingesting WhatsApp messages.
 """
-import json
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
+from pydantic import ValidationError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 
 from app.core.database import get_db
 from app.core.security import get_validated_body
@@ -40,44 +40,32 @@ async def ingest_message(
     - Validates message payload
     - Stores message with idempotency (duplicate message_id returns ok)
     """
-    # Parse and validate the JSON body
+    # Parse and validate the raw JSON body in one pass inside pydantic-core
     try:
-        data = json.loads(validated_body)
-    except json.JSONDecodeError as e:
-        logger.warning(f"Invalid JSON in webhook request: {e}")
-        raise HTTPException(status_code=422, detail="Invalid JSON")
-    
-    # Validate with Pydantic
-    try:
-        message_data = WebhookMessageRequest.model_validate(data)
-    except Exception as e:
+        message_data = WebhookMessageRequest.model_validate_json(validated_body)
+    except ValidationError as e:
         logger.warning(f"Validation error in webhook request: {e}")
         raise HTTPException(status_code=422, detail=str(e))
     
-    # Check if message already exists (idempotency)
-    existing = db.query(Message).filter(
-        Message.message_id == message_data.message_id
-    ).first()
-    
-    if existing:
-        logger.info(
-            f"Duplicate message received, returning ok",
-            extra={"extra_data": {"message_id": message_data.message_id}}
-        )
-        return WebhookResponse(status="ok")
-    
-    # Create new message
-    message = Message(
+    # Insert with idempotency: the message_id primary key turns duplicates
+    # into a no-op, so a single statement covers new, repeated and racing requests
+    stmt = sqlite_insert(Message).values(
         message_id=message_data.message_id,
         sender=message_data.from_,
         recipient=message_data.to,
         ts=message_data.ts,
         text=message_data.text,
-    )
+    ).on_conflict_do_nothing(index_elements=["message_id"])
     
-    try:
-        db.add(message)
-        db.commit()
+    result = db.execute(stmt)
+    db.commit()
+    
+    if result.rowcount == 0:
+        logger.info(
+            "Duplicate message received, returning ok",
+            extra={"extra_data": {"message_id": message_data.message_id}}
+        )
+    else:
         logger.info(
             "Message ingested successfully",
             extra={
@@ -87,12 +75,5 @@ async def ingest_message(
                 }
             }
         )
-    except IntegrityError:
-        # Race condition: another request inserted the same message_id
-        db.rollback()
-        logger.info(
-            "Duplicate message detected via constraint",
-            extra={"extra_data": {"message_id": message_data.message_id}}
-        )
     
     return WebhookResponse(status="ok")
@@ -2,7 +2,6 @@
 Application configuration using 12-factor environment variables.
 """
 import os
-from functools import lru_cache
 from typing import Optional
 
 from pydantic import Field
@@ -44,7 +43,14 @@ class Settings(BaseSettings):
         return bool(self.webhook_secret and len(self.webhook_secret) > 0)
 
 
-@lru_cache()
+# Settings singleton, built on first use
+_settings: Optional[Settings] = None
+
+
 def get_settings() -> Settings:
     """Get cached settings instance."""
-    return Settings()
+    global _settings
+    settings = _settings
+    if settings is None:
+        _settings = settings = Settings()
+    return settings
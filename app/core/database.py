@@ -2,12 +2,14 @@
 Database connection and session management.
 """
 import os
+import time
 from contextlib import contextmanager
 from pathlib import Path
 from typing import Generator
 
-from sqlalchemy import create_engine, event, text
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session, declarative_base
+from sqlalchemy.pool import QueuePool, StaticPool
 
 from app.core.config import get_settings
 from app.core.logging import get_logger
@@ -21,6 +23,10 @@ Base = declarative_base()
 _engine = None
 _SessionLocal = None
 
+# Cached readiness result: [monotonic timestamp, reachable]
+_last_check = [0.0, False]
+DB_CHECK_CACHE_SECONDS = 1.0
+
 
 def get_engine():
     """Get or create the database engine."""
@@ -42,19 +48,38 @@ def get_engine():
                 db_dir.mkdir(parents=True, exist_ok=True)
                 logger.info(f"Created database directory: {db_dir}")
         
+        # Keep a pool of open connections so the connect-time PRAGMAs are paid
+        # once per physical connection; in-memory SQLite needs a single one
+        if ":memory:" in settings.database_url:
+            pool_args = {"poolclass": StaticPool}
+        else:
+            pool_args = {
+                "poolclass": QueuePool,
+                "pool_size": 10,
+                "max_overflow": 20,
+                "pool_recycle": 3600,
+            }
+        
         _engine = create_engine(
             settings.database_url,
             connect_args=connect_args,
             echo=settings.debug,
             pool_pre_ping=True,
+            **pool_args,
         )
         
-        # Enable foreign keys for SQLite
+        # Enable foreign keys and tune SQLite for concurrent reads during writes
         if settings.database_url.startswith("sqlite"):
             @event.listens_for(_engine, "connect")
             def set_sqlite_pragma(dbapi_connection, connection_record):
                 cursor = dbapi_connection.cursor()
                 cursor.execute("PRAGMA foreign_keys=ON")
+                cursor.execute("PRAGMA journal_mode=WAL")  # Persistent, database-wide
+                cursor.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, one fsync per checkpoint
+                cursor.execute("PRAGMA temp_store=MEMORY")
+                cursor.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+                cursor.execute("PRAGMA cache_size=-64000")  # 64 MiB
+                cursor.execute("PRAGMA busy_timeout=5000")  # Milliseconds
                 cursor.close()
         
         logger.info("Database engine created", extra={"extra_data": {"database_url": settings.database_url}})
@@ -101,16 +126,54 @@ def init_db() -> None:
     
     engine = get_engine()
     Base.metadata.create_all(bind=engine)
+    
+    # create_all only adds indexes and the full-text index alongside a new
+    # messages table, so bring existing databases up to date here
+    with engine.begin() as conn:
+        message.upgrade_messages_indexes(conn)
+        message.create_messages_fts(conn)
     logger.info("Database tables created")
 
 
+def vacuum_db() -> None:
+    """
+    VACUUM the database and re-index messages for full-text search.
+    
+    VACUUM may renumber the implicit rowids the FTS5 index points at, so the
+    index is rebuilt straight after it.
+    """
+    from app.models import message
+    
+    engine = get_engine()
+    # VACUUM cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+    with engine.begin() as conn:
+        message.rebuild_messages_fts(conn)
+    logger.info("Database vacuumed and full-text index rebuilt")
+
+
 def check_db_connection() -> bool:
-    """Check if database is reachable."""
+    """Check if database is reachable, caching the result briefly."""
+    now = time.monotonic()
+    if now - _last_check[0] < DB_CHECK_CACHE_SECONDS:
+        return _last_check[1]
+    
     try:
-        engine = get_engine()
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        return True
+        # Raw pooled DBAPI connection: no SQLAlchemy transaction or text() compile
+        conn = get_engine().raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+        finally:
+            conn.close()
+        ok = True
     except Exception as e:
         logger.error(f"Database connection check failed: {e}")
-        return False
+        ok = False
+    
+    _last_check[0] = now
+    _last_check[1] = ok
+    return ok
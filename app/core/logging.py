@@ -3,10 +3,11 @@ Structured JSON logging configuration.
 """
 import logging
 import sys
-import json
-from datetime import datetime, timezone
+import time
 from typing import Any, Dict
 
+import orjson
+
 from app.core.config import get_settings
 
 
@@ -15,8 +16,12 @@ class JSONFormatter(logging.Formatter):
     
     def format(self, record: logging.LogRecord) -> str:
         """Format log record as JSON."""
+        # Format from the record's own epoch time, no datetime/tz objects
+        ts = time.gmtime(record.created)
+        timestamp = f"{time.strftime('%Y-%m-%dT%H:%M:%S', ts)}.{int(record.msecs):03d}Z"
+        
         log_data: Dict[str, Any] = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": timestamp,
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -33,7 +38,7 @@ class JSONFormatter(logging.Formatter):
         if hasattr(record, "extra_data"):
             log_data.update(record.extra_data)
         
-        return json.dumps(log_data, default=str)
+        return orjson.dumps(log_data, default=str).decode("utf-8")
 
 
 class TextFormatter(logging.Formatter):
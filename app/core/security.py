@@ -3,7 +3,7 @@ HMAC-SHA256 signature validation for webhook security.
 """
 import hmac
 import hashlib
-from typing import Optional
+from typing import Optional, Union
 
 from fastapi import Request, HTTPException, Depends
 
@@ -12,6 +12,9 @@ from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# SHA-256 block size in bytes, used for HMAC key padding (RFC 2104)
+SHA256_BLOCK_SIZE = 64
+
 
 def compute_signature(secret: str, body: bytes) -> str:
     """
@@ -24,27 +27,41 @@ def compute_signature(secret: str, body: bytes) -> str:
     Returns:
         Hex-encoded HMAC-SHA256 signature
     """
-    return hmac.new(
-        key=secret.encode("utf-8"),
-        msg=body,
-        digestmod=hashlib.sha256
-    ).hexdigest()
+    return hmac.digest(secret.encode("utf-8"), body, "sha256").hex()
+
+
+def _parse_signature(signature: str) -> Optional[bytes]:
+    """Decode a hex SHA-256 signature, or return None if it is malformed."""
+    # A hex SHA-256 digest is always 64 characters; skip hashing otherwise
+    if len(signature) != 64:
+        return None
+    
+    try:
+        return bytes.fromhex(signature)
+    except ValueError:
+        return None
 
 
-def verify_signature(secret: str, body: bytes, signature: str) -> bool:
+def verify_signature(secret: Union[str, bytes], body: bytes, signature: str) -> bool:
     """
     Verify HMAC-SHA256 signature using constant-time comparison.
     
     Args:
-        secret: The webhook secret key
+        secret: The webhook secret key (str or pre-encoded UTF-8 bytes)
         body: Raw request body bytes
-        signature: The signature to verify
+        signature: The hex-encoded signature to verify
         
     Returns:
         True if signature is valid, False otherwise
     """
-    expected_signature = compute_signature(secret, body)
-    return hmac.compare_digest(expected_signature, signature)
+    received = _parse_signature(signature)
+    if received is None:
+        return False
+    
+    if isinstance(secret, str):
+        secret = secret.encode("utf-8")
+    
+    return hmac.compare_digest(hmac.digest(secret, body, "sha256"), received)
 
 
 class SignatureValidator:
@@ -54,6 +71,31 @@ class SignatureValidator:
     
     def __init__(self, settings: Settings = None):
         self.settings = settings or get_settings()
+        
+        # Precompute the HMAC inner/outer hash states once; each request then
+        # copies them and only hashes the body and the inner digest
+        key = (self.settings.webhook_secret or "").encode("utf-8")
+        if len(key) > SHA256_BLOCK_SIZE:
+            key = hashlib.sha256(key).digest()
+        key = key.ljust(SHA256_BLOCK_SIZE, b"\x00")
+        self._inner = hashlib.sha256(bytes(b ^ 0x36 for b in key))
+        self._outer = hashlib.sha256(bytes(b ^ 0x5C for b in key))
+    
+    def _digest(self, body: bytes) -> bytes:
+        """Compute the raw HMAC-SHA256 digest of the body."""
+        inner = self._inner.copy()
+        inner.update(body)
+        outer = self._outer.copy()
+        outer.update(inner.digest())
+        return outer.digest()
+    
+    def _verify(self, body: bytes, signature: str) -> bool:
+        """Verify a hex signature against the body in constant time."""
+        received = _parse_signature(signature)
+        if received is None:
+            return False
+        
+        return hmac.compare_digest(self._digest(body), received)
     
     async def __call__(self, request: Request) -> bytes:
         """
@@ -90,7 +132,7 @@ class SignatureValidator:
         body = await request.body()
         
         # Verify signature
-        if not verify_signature(self.settings.webhook_secret, body, signature):
+        if not self._verify(body, signature):
             logger.warning(
                 "Webhook signature verification failed",
                 extra={
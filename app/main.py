@@ -10,7 +10,9 @@ from app.core.config import get_settings
 from app.core.database import init_db
 from app.core.logging import setup_logging, get_logger
 from app.api import webhook, messages, stats, health, metrics
+from app.api.health import HealthCheckInterceptor
 from app.api.metrics import MetricsMiddleware, set_startup_time
+from app.schemas.message import WebhookMessageRequest
 
 
 @asynccontextmanager
@@ -24,6 +26,9 @@ async def lifespan(app: FastAPI):
     init_db()
     logger.info("Database initialized")
     
+    # Build the deferred webhook validator before the first request
+    WebhookMessageRequest.model_rebuild()
+    
     # Record startup time for metrics
     set_startup_time()
     
@@ -86,4 +91,7 @@ def create_app() -> FastAPI:
 
 
 # Create the application instance
-app = create_app()
+fastapi_app = create_app()
+
+# Liveness probes are answered ahead of the middleware stack
+app = HealthCheckInterceptor(fastapi_app)
@@ -3,7 +3,7 @@ Message database model.
 """
 from datetime import datetime
 
-from sqlalchemy import Column, String, DateTime, Text, Index
+from sqlalchemy import Column, String, DateTime, Text, Index, column, event, table
 
 from app.core.database import Base
 
@@ -21,7 +21,7 @@ class Message(Base):
     recipient = Column(String(20), nullable=False)  # 'to'
     
     # Timestamp from the message
-    ts = Column(DateTime(timezone=True), nullable=False, index=True)
+    ts = Column(DateTime(timezone=True), nullable=False)
     
     # Message content (optional, max 4096 chars)
     text = Column(Text, nullable=True)
@@ -29,9 +29,12 @@ class Message(Base):
     # Metadata
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
     
-    # Composite index for efficient ordering
+    # Composite index for ordering, keyset seeks and since= ranges on ts (so
+    # ts needs no index of its own); the trailing sender column also makes it
+    # covering for the /stats aggregates (count, distinct senders, first/last
+    # ts), which then skip the table
     __table_args__ = (
-        Index("ix_messages_ts_message_id", "ts", "message_id"),
+        Index("ix_messages_list_cover", "ts", "message_id", "sender"),
     )
     
     def __repr__(self) -> str:
@@ -47,3 +50,83 @@ class Message(Base):
             "text": self.text,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
+
+
+# Indexes replaced by newer definitions, dropped from existing databases
+SUPERSEDED_INDEXES = ("ix_messages_ts_message_id", "ix_messages_ts")
+
+
+def upgrade_messages_indexes(connection) -> None:
+    """Add indexes missing from an existing messages table and drop superseded ones."""
+    for index in Message.__table__.indexes:
+        index.create(connection, checkfirst=True)
+    
+    for name in SUPERSEDED_INDEXES:
+        connection.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+
+# Full-text index over messages.text (SQLite FTS5, external content table).
+# Rows are addressed by the messages rowid, kept in sync by triggers. That
+# rowid is implicit (message_id is the primary key), so a VACUUM may renumber
+# it. Use database.vacuum_db, which re-indexes afterwards; startup also checks
+# for a stale index and rebuilds it.
+messages_fts = table("messages_fts", column("rowid"), column("messages_fts"))
+
+MESSAGES_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+    "text, content='messages', content_rowid='rowid', tokenize='unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts(rowid, text) VALUES (new.rowid, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text); "
+    "INSERT INTO messages_fts(rowid, text) VALUES (new.rowid, new.text); END",
+)
+
+
+def messages_fts_out_of_sync(connection) -> bool:
+    """
+    Check whether the full-text index still covers the current rowids.
+    
+    A VACUUM that renumbers the implicit rowids compacts them, so comparing
+    the row count and highest rowid of both tables catches it cheaply. It
+    cannot see rowids shuffled in place; vacuum_db re-indexes regardless.
+    """
+    messages = connection.exec_driver_sql(
+        "SELECT count(*), max(rowid) FROM messages"
+    ).one()
+    indexed = connection.exec_driver_sql(
+        "SELECT count(*), max(id) FROM messages_fts_docsize"
+    ).one()
+    return tuple(messages) != tuple(indexed)
+
+
+def rebuild_messages_fts(connection) -> None:
+    """Re-index every message from the content table."""
+    connection.exec_driver_sql("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+
+
+def create_messages_fts(connection) -> None:
+    """Create the full-text index and its triggers, rebuilding it if stale."""
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='messages_fts'"
+    ).first()
+    
+    for statement in MESSAGES_FTS_DDL:
+        connection.exec_driver_sql(statement)
+    
+    # Index rows stored before the full-text table existed, or re-index
+    # after a VACUUM renumbered the rowids
+    if not exists or messages_fts_out_of_sync(connection):
+        rebuild_messages_fts(connection)
+
+
+@event.listens_for(Message.__table__, "after_create")
+def _create_messages_fts(target, connection, **kw) -> None:
+    create_messages_fts(connection)
+
+
+@event.listens_for(Message.__table__, "before_drop")
+def _drop_messages_fts(target, connection, **kw) -> None:
+    connection.exec_driver_sql("DROP TABLE IF EXISTS messages_fts")
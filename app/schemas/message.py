@@ -1,15 +1,15 @@
 """
 Pydantic schemas for request/response validation.
 """
-import re
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 from pydantic import BaseModel, Field, field_validator
 
 
-# E.164 phone number regex pattern
-E164_PATTERN = re.compile(r"^\+[1-9]\d{1,14}$")
+# E.164 phone number pattern, matched by pydantic-core's Rust regex engine.
+# [0-9] rather than \d keeps it to ASCII digits.
+E164_PATTERN = r"^\+[1-9][0-9]{1,14}$"
 
 
 class WebhookMessageRequest(BaseModel):
@@ -24,10 +24,16 @@ class WebhookMessageRequest(BaseModel):
     from_: str = Field(
         ...,
         alias="from",
+        min_length=3,
+        max_length=16,
+        pattern=E164_PATTERN,
         description="Sender phone number in E.164 format"
     )
     to: str = Field(
         ...,
+        min_length=3,
+        max_length=16,
+        pattern=E164_PATTERN,
         description="Recipient phone number in E.164 format"
     )
     ts: datetime = Field(
@@ -42,6 +48,8 @@ class WebhookMessageRequest(BaseModel):
     
     model_config = {
         "populate_by_name": True,
+        "frozen": True,
+        "defer_build": True,  # Built at startup by the app lifespan
         "json_schema_extra": {
             "example": {
                 "message_id": "m1",
@@ -53,22 +61,6 @@ class WebhookMessageRequest(BaseModel):
         }
     }
     
-    @field_validator("from_", mode="before")
-    @classmethod
-    def validate_from_e164(cls, v: str) -> str:
-        """Validate sender phone number is E.164 format."""
-        if not v or not E164_PATTERN.match(v):
-            raise ValueError("Invalid E.164 phone number format. Must start with + followed by digits only.")
-        return v
-    
-    @field_validator("to")
-    @classmethod
-    def validate_to_e164(cls, v: str) -> str:
-        """Validate recipient phone number is E.164 format."""
-        if not v or not E164_PATTERN.match(v):
-            raise ValueError("Invalid E.164 phone number format. Must start with + followed by digits only.")
-        return v
-    
     @field_validator("ts", mode="before")
     @classmethod
     def validate_ts_utc(cls, v):
@@ -87,15 +79,16 @@ class WebhookResponse(BaseModel):
 class MessageResponse(BaseModel):
     """Schema for a single message in responses."""
     message_id: str
-    from_: str = Field(alias="from")
+    from_: str = Field(serialization_alias="from")
     to: str
     ts: datetime
     text: Optional[str] = None
     created_at: Optional[datetime] = None
     
     model_config = {
-        "populate_by_name": True,
         "from_attributes": True,
+        "frozen": True,
+        "defer_build": True,  # Response models build on first use
     }
 
 
@@ -105,15 +98,22 @@ class MessagesListResponse(BaseModel):
     total: int
     limit: int
     offset: int
+    next_cursor: Optional[Tuple[str, str]] = Field(
+        default=None,
+        description="(after_ts, after_id) for fetching the next page, if it may exist"
+    )
+    
+    model_config = {"defer_build": True}
 
 
 class SenderCount(BaseModel):
     """Schema for sender message count."""
-    from_: str = Field(alias="from")
+    from_: str = Field(serialization_alias="from")
     count: int
     
     model_config = {
-        "populate_by_name": True,
+        "frozen": True,
+        "defer_build": True,
     }
 
 
@@ -124,14 +124,20 @@ class StatsResponse(BaseModel):
     messages_per_sender: List[SenderCount]
     first_message_ts: Optional[datetime] = None
     last_message_ts: Optional[datetime] = None
+    
+    model_config = {"defer_build": True}
 
 
 class HealthResponse(BaseModel):
     """Response schema for health endpoints."""
     status: str
     checks: Optional[dict] = None
+    
+    model_config = {"defer_build": True}
 
 
 class ErrorResponse(BaseModel):
     """Standard error response schema."""
     detail: str
+    
+    model_config = {"defer_build": True}